@@ -1,15 +1,21 @@
 from spire.doc import *
-import os, shutil, re
+import os, re
 
 input_file = "demo2.docx"
-temp_file = "temp_copy.docx"
 output_md = "output_table.md"
 
-# Safe file copy
-shutil.copy(input_file, temp_file)
-
+# Load straight from the source file; Spire only reads it, so no temp copy is needed
 doc = Document()
-doc.LoadFromFile(temp_file, FileFormat.Auto)
+doc.LoadFromFile(input_file, FileFormat.Auto)
+
+
+# --- Bullet label patterns (compiled once) ---
+_RE_NUM = re.compile(r"^\d+$")
+_RE_ROMAN = re.compile(r"^(i{1,3}|iv|v|vi{0,3}|ix|x)$", re.I)
+_RE_LOWER = re.compile(r"^[a-z]$")
+_RE_UPPER = re.compile(r"^[A-Z]$")
+_RE_NDD = re.compile(r"^\d+\.\d+\.\d+$")
+_RE_ND = re.compile(r"^\d+\.\d+$")
 
 
 # --- Helper functions ---
@@ -19,17 +25,18 @@ def get_bullet_level(bullet):
 
     clean = bullet.strip().rstrip(".")
 
-    if re.match(r"^(i{1,3}|iv|v|vi{0,3}|ix|x)$", clean, re.I):
+    # Plain numbers are the most common label; they can't match the roman/letter patterns
+    if _RE_NUM.match(clean):
+        return {"level": 1, "type": "number", "value": clean}
+    elif _RE_ROMAN.match(clean):
         return {"level": 3, "type": "roman", "value": clean}
-    elif re.match(r"^[a-z]$", clean):
+    elif _RE_LOWER.match(clean):
         return {"level": 2, "type": "letter", "value": clean}
-    elif re.match(r"^[A-Z]$", clean):
+    elif _RE_UPPER.match(clean):
         return {"level": 2, "type": "letter-upper", "value": clean}
-    elif re.match(r"^\d+$", clean):
-        return {"level": 1, "type": "number", "value": clean}
-    elif re.match(r"^\d+\.\d+\.\d+$", clean):
+    elif _RE_NDD.match(clean):
         return {"level": 3, "type": "number-dot-dot", "value": clean}
-    elif re.match(r"^\d+\.\d+$", clean):
+    elif _RE_ND.match(clean):
         return {"level": 2, "type": "number-dot", "value": clean}
 
     return {"level": 0, "type": "unknown", "value": clean}
@@ -59,11 +66,16 @@ def build_hierarchical_number(bullet_info, hierarchical_levels):
 rows_data = []
 hierarchical_levels = []
 
-for s_idx in range(doc.Sections.Count):
-    section = doc.Sections.get_Item(s_idx)
+# Fetch each collection and its accessor once instead of per item
+sections = doc.Sections
+get_section = sections.get_Item
+for s_idx in range(sections.Count):
+    section = get_section(s_idx)
+    paragraphs = section.Paragraphs
+    get_paragraph = paragraphs.get_Item
 
-    for p_idx in range(section.Paragraphs.Count):
-        para = section.Paragraphs.get_Item(p_idx)
+    for p_idx in range(paragraphs.Count):
+        para = get_paragraph(p_idx)
         text = para.Text.strip()
         if not text:
             continue
@@ -79,7 +91,6 @@ for s_idx in range(doc.Sections.Count):
         rows_data.append((text, bullet_text))
 
 doc.Close()
-os.remove(temp_file)
 
 # --- Markdown export ---
 md_lines = [
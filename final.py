@@ -5,36 +5,95 @@ import os
 import sys
 import re
 from collections import defaultdict
-import xml.etree.ElementTree as ET
+from lxml import etree
 
 sys.dont_write_bytecode = True
 os.environ['PYTHONDONTWRITEBYTECODE'] = '1'
 
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P = W_NS + 'p'
+W_T = W_NS + 't'
+W_TBL = W_NS + 'tbl'
+W_R = W_NS + 'r'
+W_INS = W_NS + 'ins'
+W_HYPERLINK = W_NS + 'hyperlink'
+W_NUMPR = W_NS + 'numPr'
+W_ABSNUM = W_NS + 'abstractNum'
+W_NUM = W_NS + 'num'
+W_LVL = W_NS + 'lvl'
+W_ABSNUMID = W_NS + 'abstractNumId'
+W_NUMFMT = W_NS + 'numFmt'
+W_LVLTEXT = W_NS + 'lvlText'
+W_VAL = W_NS + 'val'
+W_ILVL_ATTR = W_NS + 'ilvl'
+W_NUMID_ATTR = W_NS + 'numId'
+
+# Word list levels run from 0 to 8
+MAX_LIST_LEVELS = 9
+
+MARKDOWN_HEADER_LINES = ("| para_id | header | bullet | para_text |", "|---------|---------|---------|-----------|")
+
+# Leading list label typed into the paragraph text, e.g. "1.", "a)", "2.1.3."
+_NUM_PREFIX_RE = re.compile(r'^[\d\w]+(?:\.[\d\w]+)*[\.\)]\s*')
+
+
+_ROMAN_VALUES = [
+    (1000, "M"), (900, "CM"), (500, "D"), (400, "CD"),
+    (100, "C"), (90, "XC"), (50, "L"), (40, "XL"),
+    (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")
+]
+
+
+def _to_roman_slow(num):
+    """Build the upper-case Roman numeral for num."""
+    parts = []
+    for v, sym in _ROMAN_VALUES:
+        while num >= v:
+            parts.append(sym)
+            num -= v
+    return "".join(parts)
+
+
+def _to_letter_slow(num):
+    """Build the upper-case letter sequence for num."""
+    parts = []
+    while num > 0:
+        num, rem = divmod(num - 1, 26)
+        parts.append(chr(65 + rem))
+    return "".join(reversed(parts))
+
+
+# List counters rarely go past a few dozen, so precompute the common labels
+_LABEL_CACHE_SIZE = 100
+_ROMAN = [_to_roman_slow(i) for i in range(1, _LABEL_CACHE_SIZE + 1)]
+_ROMAN_LOWER = [r.lower() for r in _ROMAN]
+_LETTERS = [_to_letter_slow(i) for i in range(1, _LABEL_CACHE_SIZE + 1)]
+_LETTERS_LOWER = [letter.lower() for letter in _LETTERS]
+
 
 def to_roman(num, lowercase=False):
     """Convert number to Roman numeral."""
-    vals = [
-        (1000, "M"), (900, "CM"), (500, "D"), (400, "CD"),
-        (100, "C"), (90, "XC"), (50, "L"), (40, "XL"),
-        (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")
-    ]
-    result = ""
-    for v, sym in vals:
-        while num >= v:
-            result += sym
-            num -= v
+    if 1 <= num <= _LABEL_CACHE_SIZE:
+        return (_ROMAN_LOWER if lowercase else _ROMAN)[num - 1]
+    result = _to_roman_slow(num)
     return result.lower() if lowercase else result
 
 
 def to_letter(num, lowercase=False):
     """Convert number to letter sequence (A, B, C, ..., Z, AA, AB, etc.)."""
-    result = ""
-    while num > 0:
-        num, rem = divmod(num - 1, 26)
-        result = chr(65 + rem) + result
+    if 1 <= num <= _LABEL_CACHE_SIZE:
+        return (_LETTERS_LOWER if lowercase else _LETTERS)[num - 1]
+    result = _to_letter_slow(num)
     return result.lower() if lowercase else result
 
 
+def escape_markdown_cell(text: str) -> str:
+    """Escape pipes and newlines so text fits in a single markdown table cell."""
+    # Chained str.replace is a fast C scan that returns the same object when nothing
+    # matches; str.translate with multi-character replacements is far slower.
+    return text.replace('|', '\\|').replace('\n', '<br>')
+
+
 class GenerateParaRefsForDocx:
     def __init__(self, start_index: int = 100000):
         self.data = []
@@ -45,13 +104,24 @@ class GenerateParaRefsForDocx:
             'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
             'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
         }
+        # Pre-compiled XPath selectors
+        self._xp_t = etree.XPath('.//w:t', namespaces=self.namespaces)
+        # Both read from the paragraph's first w:numPr, so numId and ilvl always come from the same one
+        self._xp_numid = etree.XPath('string((.//w:numPr)[1]/w:numId/@w:val)', namespaces=self.namespaces,
+                                     smart_strings=False)
+        self._xp_ilvl = etree.XPath('string((.//w:numPr)[1]/w:ilvl/@w:val)', namespaces=self.namespaces,
+                                    smart_strings=False)
         # Numbering related attributes
         self.numbering_map = defaultdict(dict)
-        self.global_counters = defaultdict(int)
-        self.global_stack = {}
+        self.global_counters = [0] * MAX_LIST_LEVELS
+        self.global_stack = [None] * MAX_LIST_LEVELS
         self.visible_stack = {}  # Track which levels have visible items
         self.last_numId = None
         self.last_ilvl = -1
+        self._style_names = {}  # Lower-cased style name by paragraph style id
+        # Streaming output (see process_docx_file's writer argument)
+        self._writer = None
+        self._rows_written = 0
 
     def get_numbering(self, doc: Document) -> defaultdict:
         """Extract numbering information from the document."""
@@ -61,29 +131,29 @@ class GenerateParaRefsForDocx:
             if not numbering_part:
                 return numbering_map
 
-            root = ET.fromstring(numbering_part.blob)
             abstract_nums = {}
-
-            for absnum in root.findall("w:abstractNum", self.namespaces):
-                abs_id = absnum.attrib.get(f"{{{self.namespaces['w']}}}abstractNumId")
-                abs_levels = {}
-                for lvl in absnum.findall("w:lvl", self.namespaces):
-                    ilvl = lvl.attrib.get(f"{{{self.namespaces['w']}}}ilvl")
-                    num_fmt_el = lvl.find("w:numFmt", self.namespaces)
-                    lvl_text_el = lvl.find("w:lvlText", self.namespaces)
-                    fmt = num_fmt_el.attrib.get(
-                        f"{{{self.namespaces['w']}}}val") if num_fmt_el is not None else "bullet"
-                    pattern = lvl_text_el.attrib.get(
-                        f"{{{self.namespaces['w']}}}val") if lvl_text_el is not None else "•"
-                    abs_levels[ilvl] = (fmt, pattern)
-                abstract_nums[abs_id] = abs_levels
-
-            for num in root.findall("w:num", self.namespaces):
-                num_id = num.attrib.get(f"{{{self.namespaces['w']}}}numId")
-                abs_id_el = num.find("w:abstractNumId", self.namespaces)
-                if abs_id_el is not None:
-                    abs_id = abs_id_el.attrib.get(f"{{{self.namespaces['w']}}}val")
-                    numbering_map[num_id] = abstract_nums.get(abs_id, {})
+            num_to_abs = {}
+
+            # python-docx has already parsed numbering.xml; walk its definitions in one pass
+            for elem in numbering_part.element.iterchildren(W_ABSNUM, W_NUM):
+                if elem.tag == W_ABSNUM:
+                    abs_id = elem.attrib.get(W_ABSNUMID)
+                    abs_levels = {}
+                    for lvl in elem.iterchildren(W_LVL):
+                        ilvl = lvl.attrib.get(W_ILVL_ATTR)
+                        num_fmt_el = lvl.find(W_NUMFMT)
+                        lvl_text_el = lvl.find(W_LVLTEXT)
+                        fmt = num_fmt_el.attrib.get(W_VAL) if num_fmt_el is not None else "bullet"
+                        pattern = lvl_text_el.attrib.get(W_VAL) if lvl_text_el is not None else "•"
+                        abs_levels[ilvl] = (fmt, pattern)
+                    abstract_nums[abs_id] = abs_levels
+                else:
+                    abs_id_el = elem.find(W_ABSNUMID)
+                    if abs_id_el is not None:
+                        num_to_abs[elem.attrib.get(W_NUMID_ATTR)] = abs_id_el.attrib.get(W_VAL)
+
+            for num_id, abs_id in num_to_abs.items():
+                numbering_map[num_id] = abstract_nums.get(abs_id, {})
 
         except Exception as e:
             print(f"Error extracting numbering information: {e}")
@@ -101,44 +171,27 @@ class GenerateParaRefsForDocx:
         and keeping only the visible hyperlink text (not the target URL)."""
         parts = []
 
+        # Deletions and any other wrappers are skipped; only direct run, hyperlink and
+        # insertion children contribute text
         for child in paragraph._element:
-            tag = child.tag
-
-            if tag.endswith('}hyperlink'):
-                text_runs = child.findall('.//w:t', self.namespaces)
-                display_text = "".join([t.text for t in text_runs if t.text])
-                if display_text:
-                    parts.append(display_text)
-
-            elif tag.endswith('}r'):
-                for t in child.findall('.//w:t', self.namespaces):
-                    if t.text:
-                        parts.append(t.text)
-
-            elif tag.endswith('}ins'):
-                for t in child.findall('.//w:t', self.namespaces):
+            if child.tag in (W_R, W_HYPERLINK, W_INS):
+                for t in self._xp_t(child):
                     if t.text:
                         parts.append(t.text)
 
-            elif tag.endswith('}del'):
-                continue
-
         return "".join(parts).strip()
 
     def get_bullet_number(self, paragraph: Paragraph) -> tuple[str, int, str]:
         """Extract bullet or number from a paragraph using Word's actual values.
         Returns: (full_bullet_from_word, level, current_value_from_word)"""
-        numPr = paragraph._element.find(".//w:numPr", self.namespaces)
-        if numPr is None:
+        numId = self._xp_numid(paragraph._element)
+        if not numId:
             return "", -1, ""
 
-        numId_el = numPr.find("w:numId", self.namespaces)
-        ilvl_el = numPr.find("w:ilvl", self.namespaces)
-        numId = numId_el.attrib.get(f"{{{self.namespaces['w']}}}val") if numId_el is not None else None
-        ilvl = ilvl_el.attrib.get(f"{{{self.namespaces['w']}}}val") if ilvl_el is not None else "0"
+        ilvl = self._xp_ilvl(paragraph._element) or "0"
         ilvl_int = int(ilvl)
-
-        if not numId:
+        if not 0 <= ilvl_int < MAX_LIST_LEVELS:
+            # Outside Word's list levels; treat as unnumbered rather than index past the counters
             return "", -1, ""
 
         # Get current level format type
@@ -154,9 +207,9 @@ class GenerateParaRefsForDocx:
         self.global_counters[ilvl_int] += 1
 
         # Reset deeper levels
-        for deeper in range(ilvl_int + 1, 9):
+        for deeper in range(ilvl_int + 1, MAX_LIST_LEVELS):
             self.global_counters[deeper] = 0
-            self.global_stack.pop(deeper, None)
+            self.global_stack[deeper] = None
 
         # Get the counter value for current level - THIS IS WORD'S ACTUAL VALUE
         n = self.global_counters[ilvl_int]
@@ -198,7 +251,7 @@ class GenerateParaRefsForDocx:
         """
         # Start from the immediate parent level and work up
         for parent_level in range(current_level - 1, -1, -1):
-            if parent_level in self.global_stack:
+            if self.global_stack[parent_level] is not None:
                 return self.global_stack[parent_level]
 
         # If no parent found, return empty string
@@ -213,7 +266,7 @@ class GenerateParaRefsForDocx:
         self.visible_stack[level] = current_val
 
         # Reset deeper visible levels
-        for deeper in range(level + 1, 9):
+        for deeper in range(level + 1, MAX_LIST_LEVELS):
             self.visible_stack.pop(deeper, None)
 
         # Build bullet from visible parents only
@@ -224,6 +277,15 @@ class GenerateParaRefsForDocx:
 
         return ".".join(visible_parts)
 
+    def get_style_name(self, paragraph: Paragraph) -> str:
+        """Lower-cased style name of the paragraph, cached per style id for the current document"""
+        style_id = paragraph._p.style
+        style_name = self._style_names.get(style_id)
+        if style_name is None:
+            style_name = getattr(paragraph.style, 'name', '').lower() if paragraph.style else ''
+            self._style_names[style_id] = style_name
+        return style_name
+
     def extract_text_from_paragraph(self, paragraph: Paragraph) -> tuple[str, str, int, str]:
         """Extract text and bullet/number from paragraph.
         Returns: (bullet, text, level, current_value_from_word)"""
@@ -232,7 +294,7 @@ class GenerateParaRefsForDocx:
 
         # Remove the numbering from the text if it's already there
         if bullet:
-            text = re.sub(r'^[\d\w]+(?:\.[\d\w]+)*[\.\)]\s*', '', text)
+            text = _NUM_PREFIX_RE.sub('', text, 1)
 
         return bullet, text, level, current_val
 
@@ -240,7 +302,7 @@ class GenerateParaRefsForDocx:
         """Extract content from a table cell, handling nested tables and paragraphs"""
         content_parts = []
         for element in cell._element:
-            if element.tag.endswith('}p'):
+            if element.tag == W_P:
                 paragraph = Paragraph(element, cell)
                 bullet, para_text, level, current_val = self.extract_text_from_paragraph(paragraph)
                 if para_text:
@@ -253,7 +315,7 @@ class GenerateParaRefsForDocx:
                             content_parts.append(para_text)
                     else:
                         content_parts.append(para_text)
-            elif element.tag.endswith('}tbl'):
+            elif element.tag == W_TBL:
                 nested_table = Table(element, cell)
                 nested_table_md = self.process_table(nested_table)
                 if nested_table_md:
@@ -261,6 +323,14 @@ class GenerateParaRefsForDocx:
 
         return " ".join(content_parts).strip()
 
+    def _cell_nonempty(self, cell: _Cell) -> bool:
+        """Cheap check whether a cell may produce content, without extracting it.
+        Numbered paragraphs count as content since extracting them advances the list counters."""
+        for element in cell._element.iter(W_T, W_NUMPR):
+            if element.tag == W_NUMPR or (element.text and not element.text.isspace()):
+                return True
+        return False
+
     def process_table(self, table: Table) -> str:
         """Process a table and convert it to markdown table format, skipping empty tables."""
         markdown_table = []
@@ -268,7 +338,12 @@ class GenerateParaRefsForDocx:
         if not rows:
             return ""
 
-        header_cells = [self.extract_cell_content(cell) for cell in rows[0].cells]
+        # Skip tables with an empty header row before extracting or resolving anything else
+        header_row_cells = rows[0].cells
+        if not any(self._cell_nonempty(cell) for cell in header_row_cells):
+            return ""
+
+        header_cells = [self.extract_cell_content(cell) for cell in header_row_cells]
         if not any(cell.strip() for cell in header_cells):
             return ""
 
@@ -287,22 +362,38 @@ class GenerateParaRefsForDocx:
 
         return "\n".join(markdown_table) if markdown_table else ""
 
-    def extract_plain_text(self, file_path: str) -> str:
-        """Fallback method to extract plain text from DOCX"""
+    def _iter_body_items(self, doc: Document):
+        """Walk the document body once, yielding ('p', Paragraph) and ('tbl', Table) in document order"""
+        for element in doc.element.body:
+            if element.tag == W_P:
+                yield 'p', Paragraph(element, doc)
+            elif element.tag == W_TBL:
+                yield 'tbl', Table(element, doc)
+
+    def extract_plain_text(self, file_path: str, doc: Document = None, numbering_map: defaultdict = None) -> str:
+        """Fallback method to extract plain text from DOCX.
+        An already loaded document and its get_numbering result can be passed in to avoid re-reading the file."""
         try:
-            doc = Document(file_path)
+            if doc is None:
+                doc = Document(file_path)
+
+            # Paragraphs are emitted before tables, so split the single walk into the two groups
+            paragraphs = []
+            tables = []
+            for kind, item in self._iter_body_items(doc):
+                (paragraphs if kind == 'p' else tables).append(item)
             full_text = []
             table_index = 0
 
             # Initialize numbering for plain text extraction
-            self.numbering_map = self.get_numbering(doc)
-            self.global_counters.clear()
-            self.global_stack.clear()
+            self.numbering_map = numbering_map if numbering_map is not None else self.get_numbering(doc)
+            self.global_counters[:] = [0] * MAX_LIST_LEVELS
+            self.global_stack[:] = [None] * MAX_LIST_LEVELS
             self.visible_stack.clear()
             self.last_numId = None
             self.last_ilvl = -1
 
-            for paragraph in doc.paragraphs:
+            for paragraph in paragraphs:
                 if paragraph.text.strip():
                     bullet, para_text, level, current_val = self.extract_text_from_paragraph(paragraph)
                     if para_text:
@@ -316,7 +407,7 @@ class GenerateParaRefsForDocx:
                         else:
                             full_text.append(para_text)
 
-            for table in doc.tables:
+            for table in tables:
                 table_index += 1
                 table_markdown = self.process_table(table)
                 if table_markdown:
@@ -326,38 +417,47 @@ class GenerateParaRefsForDocx:
                     })
                     full_text.append(f"SEE TABLE_#{table_index} below")
 
-            result = "\n\n".join(full_text)
+            output = ["\n\n".join(full_text)]
 
             if self.tables:
-                result += "\n\n"
+                output.append("\n\n")
                 for table_info in self.tables:
-                    result += f"\nTABLE_#{table_info['index']}:\n{table_info['content']}\n"
+                    output.append(f"\nTABLE_#{table_info['index']}:\n{table_info['content']}\n")
 
-            return result
+            return "".join(output)
 
         except Exception as e:
             print(f"Error in extract_plain_text: {e}")
             return ""
 
-    def process_docx_file(self, file_path: str, start_index: int) -> str:
-        """Process a DOCX file and return markdown content including headers and short-title detection"""
+    def process_docx_file(self, file_path: str, start_index: int, writer=None) -> str:
+        """Process a DOCX file and return markdown content including headers and short-title detection.
+        If a writer callable (e.g. an open file's write) is given, the markdown is passed to it
+        piece by piece as rows are produced instead of being built in memory, and "" is returned.
+        A failure after rows have been streamed is re-raised, since the output is incomplete."""
+        doc = None
+        numbering_map = None
+        self._writer = writer
+        self._rows_written = 0
         try:
             self.para_id_counter = start_index
             doc = Document(file_path)
+            self._style_names = {}
 
             # Initialize numbering
-            self.numbering_map = self.get_numbering(doc)
-            self.global_counters.clear()
-            self.global_stack.clear()
+            numbering_map = self.get_numbering(doc)
+            self.numbering_map = numbering_map
+            self.global_counters[:] = [0] * MAX_LIST_LEVELS
+            self.global_stack[:] = [None] * MAX_LIST_LEVELS
             self.visible_stack.clear()
             self.last_numId = None
             self.last_ilvl = -1
 
             current_header = ""
 
-            for element in doc.element.body:
-                if element.tag.endswith('}p'):
-                    paragraph = Paragraph(element, doc)
+            for kind, item in self._iter_body_items(doc):
+                if kind == 'p':
+                    paragraph = item
 
                     # Always process bullet numbering to maintain Word's hierarchy state
                     bullet, level, current_val = self.get_bullet_number(paragraph)
@@ -376,79 +476,108 @@ class GenerateParaRefsForDocx:
 
                     # Remove the numbering from the text if it's already there
                     if display_bullet:
-                        para_text = re.sub(r'^[\d\w]+(?:\.[\d\w]+)*[\.\)]\s*', '', para_text)
+                        para_text = _NUM_PREFIX_RE.sub('', para_text, 1)
 
-                    style_name = getattr(paragraph.style, 'name', '').lower() if paragraph.style else ''
-                    word_count = len(para_text.split())
+                    # Only "fewer than 6 words" matters, so stop splitting once that's decided
+                    word_count = len(para_text.split(None, 5))
 
                     # Check if it's a top-level bullet (no dots in the bullet)
                     is_top_level = display_bullet == "" or "." not in display_bullet
 
                     # Update header if:
-                    # 1. It's a heading style, OR
-                    # 2. It's a short text (≤6 words)
-                    if "heading" in style_name or (word_count < 6):
+                    # 1. It's a short text (≤6 words), OR
+                    # 2. It's a heading style (only resolved when the word count doesn't decide it)
+                    if word_count < 6 or "heading" in self.get_style_name(paragraph):
                         current_header = para_text.strip()
                     # If it's a sub-item (has dots in bullet), don't update the header
                     elif not is_top_level:
                         pass  # Keep the current header
 
                     # Add paragraph regardless of whether it's a header
-                    self.data.append({
+                    self.add_row({
                         'para_id': self.generate_guid(),
                         'header': current_header,
                         'para_text': para_text,
                         'bullet': display_bullet
                     })
 
-                elif element.tag.endswith('}tbl'):
+                elif kind == 'tbl':
                     self.table_counter += 1
-                    table = Table(element, doc)
-                    table_markdown = self.process_table(table)
+                    table_markdown = self.process_table(item)
 
                     if table_markdown:
                         self.tables.append({
                             'index': self.table_counter,
                             'content': table_markdown
                         })
-                        self.data.append({
+                        self.add_row({
                             'para_id': self.generate_guid(),
                             'header': current_header,
                             'para_text': f"SEE TABLE_{self.table_counter} below"
                         })
 
-            if self.data:
+            if writer is not None:
+                # Only what was streamed by this call counts; self.data may hold rows from earlier calls
+                if self._rows_written:
+                    for chunk in self.iter_table_blocks():
+                        writer(chunk)
+                    return ""
+            elif self.data:
                 return self.generate_markdown_table_with_header()
-            else:
-                return self.extract_plain_text(file_path)
+            return self.plain_text_fallback(file_path, doc, numbering_map)
 
         except Exception as e:
             print(f"Error processing DOCX: {e}")
-            return self.extract_plain_text(file_path)
+            if self._rows_written:
+                # Rows already streamed out can't be taken back; finish with the tables seen so far
+                # and let the caller know the output is incomplete
+                for chunk in self.iter_table_blocks():
+                    writer(chunk)
+                raise
+            return self.plain_text_fallback(file_path, doc, numbering_map)
+
+    def plain_text_fallback(self, file_path: str, doc: Document = None, numbering_map: defaultdict = None) -> str:
+        """Run extract_plain_text, sending the result to the active writer if streaming"""
+        text = self.extract_plain_text(file_path, doc, numbering_map)
+        if self._writer is None:
+            return text
+        self._writer(text)
+        return ""
+
+    def add_row(self, item: dict):
+        """Store a row, or write it straight out as markdown when streaming"""
+        if self._writer is None:
+            self.data.append(item)
+            return
+        if not self._rows_written:
+            self._writer("\n".join(MARKDOWN_HEADER_LINES))
+        self._writer("\n" + self.markdown_row(item))
+        self._rows_written += 1
+
+    @staticmethod
+    def markdown_row(item: dict) -> str:
+        """Format a single data row as a markdown table line"""
+        escaped_header = escape_markdown_cell(item.get('header', ''))
+        escaped_bullet = escape_markdown_cell(item.get('bullet', ''))
+        escaped_text = escape_markdown_cell(item['para_text'])
+        return f"| {item['para_id']} | {escaped_header} | {escaped_bullet} | {escaped_text} |"
+
+    def iter_table_blocks(self):
+        """Yield the TABLE_n sections that follow the main markdown table"""
+        if self.tables:
+            yield "\n\n"
+            for table_info in self.tables:
+                yield f"\nTABLE_{table_info['index']}:\n{table_info['content']}\n"
 
     def generate_markdown_table_with_header(self) -> str:
         """Generate markdown table with headers"""
         if not self.data:
             return ""
 
-        lines = ["| para_id | header | bullet | para_text |", "|---------|---------|---------|-----------|"]
-
-        for item in self.data:
-            header = item.get('header', '')
-            bullet = item.get('bullet', '')
-            escaped_text = item['para_text'].replace('|', '\\|').replace('\n', '<br>')
-            escaped_header = header.replace('|', '\\|').replace('\n', '<br>')
-            escaped_bullet = bullet.replace('|', '\\|')
-            lines.append(f"| {item['para_id']} | {escaped_header} | {escaped_bullet} | {escaped_text} |")
-
-        result = "\n".join(lines)
-
-        if self.tables:
-            result += "\n\n"
-            for table_info in self.tables:
-                result += f"\nTABLE_{table_info['index']}:\n{table_info['content']}\n"
-
-        return result
+        markdown_row = self.markdown_row
+        rows = [markdown_row(item) for item in self.data]
+        lines = [*MARKDOWN_HEADER_LINES, *rows]
+        return "".join(["\n".join(lines), *self.iter_table_blocks()])
 
     def clear_data(self):
         """Clear the stored data"""
@@ -466,9 +595,13 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     processor = GenerateParaRefsForDocx(start_index=args.start_index)
-    markdown_output = processor.process_docx_file(args.input_file, args.start_index)
-
     output_file = os.path.splitext(args.input_file)[0] + "_output.md"
+
+    # Stream rows to disk as they are produced rather than building the whole markdown in memory
+    try:
+        with open(output_file, "w", encoding="utf-8") as f:
+            processor.process_docx_file(args.input_file, args.start_index, writer=f.write)
+    except Exception as e:
+        print(f"failed: output in {output_file} is incomplete ({e})")
+        sys.exit(1)
     print("success")
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(markdown_output)
\ No newline at end of file